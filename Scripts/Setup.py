@@ -1,22 +1,23 @@
 #!/usr/bin/env python3
 
 import argparse
+import concurrent.futures
+import functools
 import os
 import shutil
 import stat
 import subprocess
 import sys
-import psutil
 import json
 
 # Target folders to delete
-folders = [
+FOLDERS = frozenset( {
 	".vs",
 	"Binaries",
 	"DerivedDataCache",
 	"Intermediate",
 	"Saved"
-]
+} )
 
 '''
     print_log method
@@ -36,35 +37,111 @@ def print_warn( message ) : print_log( message, 33 )
 def print_errr( message ) : print_log( message, 31 )
 
 '''
-	is_process_running function
-	@brief : Check if a process with process_name is currently running.
-	@param process_name : Target process name.
-	@return Process from psutil or None if no process found.
+	find_processes_linux function
+	@brief : Find processes by name with a direct /proc scan, one small read
+			of /proc/<pid>/comm per pid instead of the multiple opens psutil
+			performs for each process. A comm matches on exact equality with
+			the target name or its .exe stripped stem, or as a 15 character
+			kernel truncation of either.
+	@param process_names : Target process names set, already lowercased.
+	@return Dictionary of matched process name to pid.
 '''
-def is_process_running( process_name ) :
-	for process in psutil.process_iter( [ 'name', 'cmdline' ] ):
-		try : 
-			if process_name.lower( ) not in process.info[ 'name' ].lower( ) :
+def find_processes_linux( process_names ) :
+	stems = { process_name : process_name[ : -4 ] if process_name.endswith( '.exe' ) else process_name for process_name in process_names }
+	found = { }
+
+	for pid in os.listdir( '/proc' ) :
+		if not pid.isdigit( ) :
+			continue
+
+		try :
+			with open( f'/proc/{pid}/comm' ) as f :
+				comm = f.read( ).strip( ).lower( )
+		except OSError :
+			continue
+
+		if not comm :
+			continue
+
+		for process_name, stem in stems.items( ) :
+			if process_name in found :
 				continue
-			
-			return process
-		except ( psutil.NoSuchProcess, psutil.AccessDenied ) :
+
+			if comm == process_name or comm == stem or ( len( comm ) == 15 and ( process_name.startswith( comm ) or stem.startswith( comm ) ) ) :
+				found[ process_name ] = int( pid )
+
+		if len( found ) == len( process_names ) :
+			break
+
+	return found
+
+'''
+	get_process_cmdline function
+	@brief : Read the command line of a matched process, straight from
+			/proc/<pid>/cmdline for the pids found by the Linux scan and
+			through psutil everywhere else.
+	@param process : Pid from the Linux scan or psutil Process.
+	@return Command line argument list, empty when the process is gone.
+'''
+def get_process_cmdline( process ) :
+	if isinstance( process, int ) :
+		try :
+			with open( f'/proc/{process}/cmdline', 'rb' ) as f :
+				return [ argument.decode( errors='replace' ) for argument in f.read( ).split( b'\0' ) if argument ]
+		except OSError :
+			return [ ]
+
+	import psutil
+
+	try :
+		return process.cmdline( )
+	except ( psutil.NoSuchProcess, psutil.AccessDenied ) :
+		return [ ]
+
+'''
+	find_blocking_processes function
+	@brief : Find all running processes matching the target names with a
+			single traversal of the process list, without touching psutil
+			on Linux.
+	@param process_names : Target process names set.
+	@return Dictionary of matched process name to pid on Linux or psutil
+			Process elsewhere.
+'''
+def find_blocking_processes( process_names ) :
+	process_names = { process_name.lower( ) for process_name in process_names }
+
+	if sys.platform.startswith( 'linux' ) :
+		return find_processes_linux( process_names )
+
+	import psutil
+
+	found = { }
+
+	# process_iter swallows process races itself since psutil 5.9, no
+	# per-iteration try/except needed, only a None name for dead entries.
+	for process in psutil.process_iter( [ 'name' ] ) :
+		name = ( process.info.get( 'name' ) or '' ).lower( )
+
+		if not name :
 			continue
 
-	return None
+		for process_name in process_names :
+			if process_name not in found and process_name in name :
+				found[ process_name ] = process
+
+		if len( found ) == len( process_names ) :
+			break
+
+	return found
 
 '''
 	is_running_vs_solution function
 	@brief : Check if the current project solution is opened in visual studio.
-	@param uproject_path : Target uproject path.
+	@param processes : Dictionary of blocking processes from find_blocking_processes.
 	@return True when visual studio is running the solution.
 '''
-def is_running_vs_solution( uproject_path ) :
-	process = is_process_running( 'devenv.exe' )
-
-	if process is not None :
-		args = process.info.get( 'cmdline', [ ] )
-
+def is_running_vs_solution( processes ) :
+	if 'devenv.exe' in processes :
 		# TODO : Specific check, for now consider all vs instance to run the solution.
 
 		print_errr( '> Please close visual studio before executing the script.' )
@@ -76,18 +153,22 @@ def is_running_vs_solution( uproject_path ) :
 '''
 	is_running_ue_solution function
 	@brief : Check if the current project solution is opened in unreal engine editor.
-	@param uproject_path : Target uproject path.
+	@param uproject_path : Target .uproject file path.
+	@param processes : Dictionary of blocking processes from find_blocking_processes.
 	@return True when unreal engine editor is running the solution.
 '''
-def is_running_ue_solution( uproject_path ) :
+def is_running_ue_solution( uproject_path, processes ) :
 	solution = os.path.basename( uproject_path ).lower( )
 
-	for editor in [ 'UE4Editor.exe', 'UnrealEditor.exe' ] :
-		process = is_process_running( editor )
+	for editor in ( 'ue4editor.exe', 'unrealeditor.exe' ) :
+		process = processes.get( editor )
 
 		if process is not None :
-			for argument in process.info.get( 'cmdline', [ ] ) :
-				if solution in argument.lower( ) :
+			for argument in get_process_cmdline( process ) :
+				# UE receives the .uproject as a path argument, lowercasing
+				# only its basename compares filename to filename without
+				# allocating full path copies.
+				if solution in os.path.basename( argument ).lower( ) :
 					print_errr( '> Please close unreal editor before executing the script.' )
 
 					return True
@@ -96,9 +177,12 @@ def is_running_ue_solution( uproject_path ) :
 
 '''
 	resolve_engine_path function
+	@brief : Cached so repeated calls reuse the EPIC_DIR read and the
+			engine folder stat.
 	@param engine_version Target engine version.
 	@return Return final engine path to the query engine version.
 '''
+@functools.lru_cache( maxsize=None )
 def resolve_engine_path( engine_version ) :
 	epic_path = os.environ.get( 'EPIC_DIR' )
 
@@ -138,22 +222,107 @@ def resolve_project_path( arg_path ) :
 
 '''
 	clear_directory function
-	@brief : Clear the target path by removing any folder present in folders array.
+	@brief : Clear the target path by removing any .sln file and collecting
+			any folder present in folders array for deletion.
 	@param target_path : Target path to clear
+	@return List of folder paths to delete.
 '''
 def clear_directory( target_path ) :
-	for path_name in os.listdir( target_path ) :
-		full_path = os.path.join( target_path, path_name )
+	targets = [ ]
+	dir_fd = os.open( target_path, os.O_RDONLY | os.O_DIRECTORY ) if hasattr( os, 'O_DIRECTORY' ) else None
+
+	try :
+		with os.scandir( target_path ) as entries :
+			for entry in entries :
+				if entry.is_dir( follow_symlinks=False ) :
+					if entry.name in FOLDERS :
+						targets.append( entry.path )
+				elif entry.name.lower( ).endswith( '.sln' ) :
+					print_warn( f'> Removed {entry.path}' )
+
+					if dir_fd is not None :
+						os.unlink( entry.name, dir_fd=dir_fd )
+					else :
+						os.remove( entry.path )
+	finally :
+		if dir_fd is not None :
+			os.close( dir_fd )
+
+	return targets
+
+'''
+	rmtree_scandir function
+	@brief : Delete a folder tree with a scandir descent, entry types come
+			from the directory listing and names are resolved relative to
+			an open fd, so no stat syscall is issued at all.
+	@param target_path : Target folder path or name to delete.
+	@param dir_fd : Open fd of the parent folder for relative resolution.
+'''
+def rmtree_scandir( target_path, dir_fd=None ) :
+	fd = os.open( target_path, os.O_RDONLY | os.O_DIRECTORY, dir_fd=dir_fd )
+
+	try :
+		with os.scandir( fd ) as entries :
+			for entry in entries :
+				if entry.is_dir( follow_symlinks=False ) :
+					rmtree_scandir( entry.name, dir_fd=fd )
+				else :
+					os.unlink( entry.name, dir_fd=fd )
+	finally :
+		os.close( fd )
+
+	os.rmdir( target_path, dir_fd=dir_fd )
+
+'''
+	fast_rmtree function
+	@brief : Delete a folder tree with the native shell command, which beats
+			shutil.rmtree on large trees, falling back to the stat-free
+			scandir descent then shutil.rmtree when it fails.
+	@param target_path : Target folder path to delete.
+'''
+def fast_rmtree( target_path ) :
+	if os.name == 'nt' :
+		result = subprocess.run( f'rd /s /q "{target_path}"', shell=True )
+	else :
+		result = subprocess.run( [ 'rm', '-rf', target_path ] )
+
+	if result.returncode == 0 :
+		return
+
+	if hasattr( os, 'O_DIRECTORY' ) :
+		try :
+			rmtree_scandir( target_path )
 
-		if os.path.isdir( full_path ) :
-			if path_name in folders :
-				print_warn( f'> Removed {full_path}' )
+			return
+		except OSError :
+			pass
 
-				shutil.rmtree( full_path )
-		elif os.path.splitext( path_name )[ -1 ].lower( ) == '.sln' :
-			print_warn( f'> Removed {full_path}' )
+	shutil.rmtree( target_path )
 
-			os.remove( full_path )
+'''
+	remove_targets function
+	@brief : Delete the target folders in parallel, each worker spawns one
+			native delete process, so concurrency is bounded by the cpu count.
+	@param targets : List of folder paths to delete.
+'''
+def remove_targets( targets ) :
+	if not targets :
+		return
+
+	max_workers = min( 32, os.cpu_count( ) or 4, len( targets ) )
+
+	with concurrent.futures.ThreadPoolExecutor( max_workers=max_workers ) as executor :
+		futures = { executor.submit( fast_rmtree, target ) : target for target in targets }
+
+		for future in concurrent.futures.as_completed( futures ) :
+			target = futures[ future ]
+
+			try :
+				future.result( )
+
+				print_warn( f'> Removed {target}' )
+			except Exception as e :
+				print_errr( f'> Can\'t remove {target} :\n{e}' )
 
 '''
 	get_plugins_path function
@@ -162,28 +331,72 @@ def clear_directory( target_path ) :
 def get_plugins_path( root_path ) :
 	return os.path.join( root_path, 'Plugins' )
 
+'''
+	iter_delete_targets function
+	@brief : Walk the project root and every plugin once, yielding each
+			folder to delete and removing .sln files on the way.
+	@param root_path : Target project root path.
+	@return Generator of folder paths to delete.
+'''
+def iter_delete_targets( root_path ) :
+	yield from clear_directory( root_path )
+
+	plugins_path = get_plugins_path( root_path )
+
+	if not os.path.exists( plugins_path ) :
+		print_errr( f'> Can\'t find plugins directory : {plugins_path}' )
+
+		return
+
+	with os.scandir( plugins_path ) as entries :
+		for entry in entries :
+			if entry.is_dir( follow_symlinks=False ) :
+				yield from clear_directory( entry.path )
+
 '''
 	clean_project function
-	@brief : Clean a project path by removing any folder present in folders array from
+	@brief : Clean a project path by removing any folder present in FOLDERS set from
 			target project/plugins path.
 	@param project_path : Target project path to clear.
 '''
 def clean_project( project_path ) :
 	print_message( '> Cleaning project solution folder' )
 
-	clear_directory( project_path )
-
-	plugins_path = get_plugins_path( project_path )
+	targets = list( iter_delete_targets( project_path ) )
 
-	if not os.path.exists( plugins_path ) :
-		print_errr( f'> Can\'t find plugins directory : {plugins_path}' )
+	if not targets :
+		print_succ( '> Nothing to clean.' )
 
 		return
 
-	for plugin_name in os.listdir( plugins_path ) :
-		full_path = os.path.join( plugins_path, plugin_name )
+	remove_targets( targets )
 
-		clear_directory( full_path )
+'''
+	build_script_path function
+	@brief : Cached so the deep build script path is joined and stat'd once.
+	@param engine_path : Target current project engine path.
+	@return UnrealBuildTool dll path.
+'''
+@functools.lru_cache( maxsize=None )
+def build_script_path( engine_path ) :
+	return os.path.join( engine_path, 'Engine', 'Binaries', 'DotNET', 'UnrealBuildTool', 'UnrealBuildTool.dll' )
+
+'''
+	resolve_dotnet function
+	@brief : Cached lookup of the dotnet executable on PATH, executed
+			directly without a shell.
+	@return Full path to the dotnet executable.
+'''
+@functools.lru_cache( maxsize=None )
+def resolve_dotnet( ) :
+	dotnet = shutil.which( 'dotnet' )
+
+	if not dotnet :
+		print_errr( '> Can\'t find dotnet on PATH.' )
+
+		sys.exit( 1 )
+
+	return dotnet
 
 '''
 	create_project function
@@ -192,7 +405,7 @@ def clean_project( project_path ) :
 	@param project_path : Target current project uproject path.
 '''
 def create_project( engine_path, project_path ) :
-	build_script = os.path.join( engine_path, 'Engine', 'Binaries', 'DotNET', 'UnrealBuildTool', 'UnrealBuildTool.dll' )
+	build_script = build_script_path( engine_path )
 
 	if not os.path.isfile( build_script ) :
 		print_errr( f'> Can\'t find build script {build_script}' )
@@ -201,9 +414,12 @@ def create_project( engine_path, project_path ) :
 
 	print_message( '> Create project solution with UBT :' )
 
-	result = subprocess.run( [ 'dotnet', build_script, '-ProjectFiles', f'-Project={project_path}', '-Game', '-Engine', '-Progress', '-Log=Scripts/Log/UBT_Log.txt' ], shell=True )
+	process = subprocess.Popen( [ resolve_dotnet( ), build_script, '-ProjectFiles', f'-Project={project_path}', '-Game', '-Engine', '-Progress', '-Log=Scripts/Log/UBT_Log.txt' ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1 )
 
-	if result.returncode == 0 :
+	for line in process.stdout :
+		sys.stdout.write( line )
+
+	if process.wait( ) == 0 :
 		print_succ( '> UBT Project files regenerated.' )
 	else :
 		print_errr( '> Project files reneration failed.' )
@@ -220,10 +436,9 @@ def extend_solution( project_path ) :
 	 
 	plugins_path = get_plugins_path( project_path )
 
-	for plugin_name in os.listdir( plugins_path ) :
-		full_path = os.path.join( plugins_path, plugin_name )
-
-		print_message( f'{plugin_name} : {full_path}' )
+	with os.scandir( plugins_path ) as entries :
+		for entry in entries :
+			print_message( f'{entry.name} : {entry.path}' )
 
 '''
 	copy_git_middleman method
@@ -313,10 +528,12 @@ def main( ) :
 
 	args = parser.parse_args( )
 
-	engine_path  = resolve_engine_path( args.engine )
 	project_path = resolve_project_path( args.project )
+	engine_path  = resolve_engine_path( args.engine )
+
+	processes = find_blocking_processes( { 'devenv.exe', 'ue4editor.exe', 'unrealeditor.exe' } )
 
-	if is_running_vs_solution( project_path ) or is_running_ue_solution( project_path ) :
+	if is_running_vs_solution( processes ) or is_running_ue_solution( args.project, processes ) :
 		sys.exit( 1 )
 
 	setup_git_middleman( project_path )